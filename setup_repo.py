@@ -43,19 +43,22 @@ files = [
 
 def create_structure():
     print(f"📂 İşlem başlıyor...")
-    
-    # 1. Klasörleri Oluştur
-    for folder in folders:
-        Path(folder).mkdir(parents=True, exist_ok=True)
+
+    # 1. Klasörleri Oluştur: dosya ebeveynleri ve klasör listesi tek kümede
+    # birleşir, her dizin için tek makedirs çağrısı yapılır
+    parents = set(folders) | {str(Path(f).parent) for f in files}
+    for folder in sorted(parents):
+        os.makedirs(folder, exist_ok=True)
         print(f"✅ Klasör: {folder}")
 
-    # 2. Dosyaları Oluştur (Varsa dokunmaz)
+    # 2. Dosyaları Oluştur (Varsa dokunmaz): O_EXCL ile tek açışta hem
+    # varlık kontrolü hem oluşturma; exists()+touch() ikilisindeki fazladan
+    # stat ve yarış durumu ortadan kalkar
     for file_path in files:
-        file = Path(file_path)
-        if not file.exists():
-            file.touch()
+        try:
+            os.close(os.open(file_path, os.O_CREAT | os.O_WRONLY | os.O_EXCL, 0o644))
             print(f"📄 Oluşturuldu: {file_path}")
-        else:
+        except FileExistsError:
             print(f"⚠️ Zaten var (atlanıyor): {file_path}")
 
     print("\n🎉 Tüm yapı hazır!")
@@ -14,12 +14,29 @@ import argparse
 import sys
 import math
 import csv
+import json
 import time
+import re
+import gzip
+import hashlib
+import functools
+import threading
+import socket
 import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from tqdm import tqdm  # İlerleme çubuğu eklendi
 from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connection import HTTPConnection
 from requests.packages.urllib3.util.retry import Retry
 
+# İsteğe bağlı hızlandırma: isal (Intel ISA-L) stdlib gzip'in SIMD'li
+# birebir muadili; kuruluysa --decompress yolu onu kullanır
+try:
+    from isal import igzip as _gzip
+except ImportError:
+    _gzip = gzip
+
 # --- 🧠 LEVEL 3: GENOME INTELLIGENCE DATABASE ---
 GENOME_SIZES_DB = {
     "escherichia coli": 4600000,
@@ -34,38 +51,222 @@ GENOME_SIZES_DB = {
 }
 
 ENA_API_URL = "https://www.ebi.ac.uk/ena/portal/api/search"
+ENA_FILEREPORT_URL = "https://www.ebi.ac.uk/ena/portal/api/filereport"
+
+# ENA'dan istenen metadata kolonları (search ve filereport ortak kullanır)
+ENA_FIELDS = "run_accession,fastq_ftp,fastq_bytes,read_count,base_count,library_strategy,instrument_platform,scientific_name"
+
+# filereport tek çağrıda en fazla bu kadar accession kabul eder (URL uzunluk limiti)
+FILEREPORT_BATCH_LIMIT = 100
+
+# İndirme akışı chunk boyutu: 8 KiB yerine 1 MiB.
+# Throughput ~100 KiB civarında doyuma ulaşır; 1 MiB hızlı hatlarda da
+# Python döngü yükünü MB başına tek iterasyona indirir.
+CHUNK_SIZE = 1 << 20
+
+# Çıktı dosyası yazma tamponu: write() syscall'ları 4 MiB'de bir koalesan olur
+WRITE_BUFFER = 4 << 20
+
+# (bağlantı, okuma) zaman aşımı: ulaşılamayan host 2 sn'de elenir,
+# yavaş ama canlı büyük dosya okumaları 30 sn'ye kadar tolere edilir
+TIMEOUT = (2, 30)
+
+# Paralel Range indirmesi: bağlantı sayısı ve bu yolu denemeye değer alt sınır
+RANGE_CONNECTIONS = 4
+
+@dataclass(slots=True, frozen=True)
+class EnaRun:
+    """Doğrulamayı geçen adayın tipli kaydı.
+
+    Adaylar ham dict olarak taranır; çoğu hemen elendiği için aday başına
+    dataclass üretmek boşuna tahsis olur. Yalnızca seçilen aday tek bir
+    kwargs açılımıyla EnaRun'a dönüştürülür (slots=True: __dict__ yok).
+    """
+    run_accession: str = ""
+    fastq_ftp: str = ""
+    fastq_bytes: str = ""
+    read_count: str = ""
+    base_count: str = ""
+    library_strategy: str = ""
+    instrument_platform: str = ""
+    scientific_name: str = ""
+
+# EnaRun alan adları = ENA_FIELDS kolonları; ham satırdan tek geçişte kurulum
+_ENA_RUN_KEYS = tuple(ENA_FIELDS.split(','))
+
+def run_from_row(row):
+    """Ham ENA satırını (dict) EnaRun'a çevirir. Sadece kazanan aday için çağrılır."""
+    return EnaRun(**{k: row.get(k, '') or '' for k in _ENA_RUN_KEYS})
+
+# R1/R2 eş tespiti: URL başına .lower() kopyası yerine modül seviyesinde
+# derlenmiş (case-insensitive) desenler
+_R1_RE = re.compile(r"(?:_1\.fastq|_r1|\.r1\.)", re.I)
+_R2_RE = re.compile(r"(?:_2\.fastq|_r2|\.r2\.)", re.I)
+
+def detect_r1_r2(urls):
+    """URL listesinden (R1, R2) eşini ayıklar; eş bulunamazsa boş listeler döner."""
+    r1, r2 = [], []
+    for u in urls:
+        name = os.path.basename(u)  # ftp host önekini regex'e sokma
+        if _R1_RE.search(name): r1.append(u)
+        elif _R2_RE.search(name): r2.append(u)
+    return r1, r2
+
+# Manifest kolon sırası (kararlı denetim izi: sıra değişmez, yeni kolon sona eklenir)
+MANIFEST_FIELDS = ['filename', 'organism', 'platform', 'filesize', 'digest', 'digest_algo']
+
+def calculate_sha256(path):
+    """Dosyanın SHA-256 özetini hesaplar (manifest denetim izi için).
+
+    Python 3.11+ üzerinde hashlib.file_digest GIL'i bırakır ve OpenSSL'in
+    donanım hızlandırmalı (SHA-NI) yoluna akıtır; eski sürümler için 1 MiB
+    bloklu okuma aynı özeti üretir.
+    """
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        h = hashlib.sha256()
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(block)
+        return h.hexdigest()
+
+# Manifest özeti için desteklenen algoritmalar. sha256 kriptografik varsayılan;
+# blake3/xxh3 yalnızca bütünlük amaçlıysa çok daha hızlı (SIMD/çok çekirdek)
+DIGEST_ALGOS = ("sha256", "blake3", "xxh3")
+
+def resolve_digest_algo(algo):
+    """Seçilen algoritmanın bağımlılığı kurulu mu bakar; değilse sha256'ya düşer."""
+    try:
+        if algo == 'blake3':
+            import blake3  # noqa: F401
+        elif algo == 'xxh3':
+            import xxhash  # noqa: F401
+    except ImportError:
+        print(f"⚠️ {algo} paketi kurulu değil, sha256 kullanılacak.")
+        return 'sha256'
+    return algo
+
+def _new_hasher(algo):
+    """Algoritma adına karşılık update()/hexdigest() arayüzlü bir hasher döner."""
+    if algo == 'blake3':
+        import blake3
+        return blake3.blake3()
+    if algo == 'xxh3':
+        import xxhash
+        return xxhash.xxh3_64()
+    return hashlib.sha256()
 
+def calculate_digest(path, algo='sha256'):
+    """Dosyanın özetini hesaplar; sha256 için hızlı file_digest yolunu kullanır."""
+    if algo == 'sha256':
+        return calculate_sha256(path)
+    h = _new_hasher(algo)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class ManifestWriter:
+    """manifest.tsv için tek seferlik açılan, satır-ekleme odaklı yazıcı.
+
+    Dosya pipeline boyunca bir kez açılır (satır başına open/close yok),
+    başlık yalnızca yeni dosyaya yazılır ve satırlar DictWriter yansıması
+    olmadan düz csv.writer ile basılır.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # SHORT/LONG görevleri paralel yazabilir; satır ekleme kilit altında
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        is_new = not os.path.isfile(self.path)
+        # Büyük tampon: satırlar bellek içinde birikir, disk'e flush/fsync
+        # yalnızca append_rows sınırlarında iner
+        self._file = open(self.path, 'a', buffering=1 << 20, newline='')
+        self._writer = csv.writer(self._file, delimiter='\t')
+        if is_new: self._writer.writerow(MANIFEST_FIELDS)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+
+    def append(self, row):
+        """Alan sözlüğünü MANIFEST_FIELDS sırasında tek satır olarak ekler."""
+        with self._lock:
+            self._writer.writerow([row.get(k, '') for k in MANIFEST_FIELDS])
+            # Tekil eklemede satır tamponda kalmasın; süreç yarıda kesilse
+            # bile manifest o ana kadarki indirmeleri yansıtsın
+            self._file.flush()
+
+    def append_rows(self, rows):
+        """Bir adayın tüm satırlarını (R1+R2 vb.) tek kilit ve tek fsync ile ekler."""
+        with self._lock:
+            self._writer.writerows([[row.get(k, '') for k in MANIFEST_FIELDS] for row in rows])
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+# Tür adı normalizasyonu: tek geçişli whitespace tekleme için derlenmiş desen
+_WS_RE = re.compile(r"\s+")
+
+def normalize_species(s):
+    """Tür adını normalize eder: kenar/iç boşlukları tekler, küçük harfe çevirir."""
+    return _WS_RE.sub(" ", (s or "").strip()).lower()
+
+@functools.lru_cache(maxsize=8)
+def build_query(organism, strategy):
+    """ENA arama sorgusunu kurar; aynı (tür, strateji) için sonuç önbelleklenir."""
+    raw_query = f'scientific_name="{organism}"'
+    if strategy == "WGS": raw_query += ' AND library_strategy="WGS"'
+    elif strategy == "AMPLICON": raw_query += ' AND library_strategy="AMPLICON"'
+    return urllib.parse.quote(raw_query)
+
+@functools.lru_cache(maxsize=128)
 def get_genome_size(organism_name, user_size=None):
     if user_size: return int(user_size)
-    key = organism_name.lower().strip()
-    if key in GENOME_SIZES_DB:
-        size = GENOME_SIZES_DB[key]
+    # Tek get() çağrısı: üyelik testi + erişim ikilisinin çifte hash'i yok
+    size = GENOME_SIZES_DB.get(normalize_species(organism_name))
+    if size is not None:
         print(f"🧠 Smart Info: '{organism_name}' için veritabanı boyutu kullanılıyor: {size/1e6:.2f} Mb")
         return size
     print(f"⚠️ Uyarı: Genom boyutu bilinmiyor. Varsayılan bakteri boyutu (5 Mb) kullanılıyor.")
     return 5000000
 
+class TunedHTTPAdapter(HTTPAdapter):
+    """TCP_NODELAY ve 4 MiB alıcı tamponu ayarlı soketler üreten adapter.
+
+    Konteyner/eski kernel ortamlarında varsayılan TCP penceresi küçük
+    kalabilir; uzun RTT'li ENA hatlarında boruyu dolu tutmak için alıcı
+    tamponu büyütülür, küçük kontrol istekleri için Nagle kapatılır.
+    """
+    _SOCKET_OPTIONS = list(HTTPConnection.default_socket_options) + [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20),
+    ]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self._SOCKET_OPTIONS
+        return super().init_poolmanager(*args, **kwargs)
+
 def create_resilient_session():
     session = requests.Session()
-    retry = Retry(total=5, read=5, connect=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry)
+    # Ölü host'ta 5 deneme x uzun backoff beklemek yerine hızlı pes et:
+    # bir sonraki aday zaten sırada (aday döngüsü bizim "mirror fallback"imiz)
+    retry = Retry(total=3, read=3, connect=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    # Havuzlu adapter: aynı hosta giden istekler TCP/TLS el sıkışmasını paylaşır
+    adapter = TunedHTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
-def fetch_metadata(organism, strategy):
+def fetch_metadata(session, organism, strategy):
     print(f"🔍 ENA Taranıyor: {organism} ({strategy})...")
-    fields = "run_accession,fastq_ftp,fastq_bytes,read_count,base_count,library_strategy,instrument_platform,scientific_name"
-    raw_query = f'scientific_name="{organism}"'
-    if strategy == "WGS": raw_query += ' AND library_strategy="WGS"'
-    elif strategy == "AMPLICON": raw_query += ' AND library_strategy="AMPLICON"'
-
-    safe_query = urllib.parse.quote(raw_query)
+    fields = ENA_FIELDS
+    safe_query = build_query(organism, strategy)
     final_url = f"{ENA_API_URL}?result=read_run&format=json&limit=200&fields={fields}&query={safe_query}"
 
-    session = create_resilient_session()
     try:
-        response = session.get(final_url, timeout=30)
+        response = session.get(final_url, timeout=TIMEOUT)
         response.raise_for_status()
         data = response.json()
         if not data:
@@ -76,7 +277,46 @@ def fetch_metadata(organism, strategy):
         print(f"❌ API Hatası: {e}")
         sys.exit(1)
 
-def smart_select_and_download(metadata, target_platform, target_cov, genome_size, output_dir, session, manifest_writer):
+def fetch_metadata_batch(session, accessions):
+    """Verilen run accession listesinin metadata'sını TEK filereport çağrısıyla çeker.
+
+    N ayrı HTTPS isteği yerine accession'lar virgülle birleştirilip tek TSV
+    yanıtı olarak alınır (N roundtrip -> 1). 400 dönerse (URL uzunluk limiti)
+    accession başına tek tek istek atan yedek yola düşer.
+    """
+    print(f"🔍 ENA Filereport: {len(accessions)} accession tek istekte sorgulanıyor...")
+
+    def _filereport_rows(batch):
+        params = {"accession": ",".join(batch), "result": "read_run", "fields": ENA_FIELDS, "format": "tsv"}
+        response = session.get(ENA_FILEREPORT_URL, params=params, timeout=TIMEOUT)
+        response.raise_for_status()
+        return list(csv.DictReader(response.text.splitlines(), delimiter='\t'))
+
+    rows = []
+    for start in range(0, len(accessions), FILEREPORT_BATCH_LIMIT):
+        batch = accessions[start:start + FILEREPORT_BATCH_LIMIT]
+        try:
+            rows.extend(_filereport_rows(batch))
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 400 and len(batch) > 1:
+                # Yedek yol: toplu istek reddedildi (URL limiti), tek tek dene
+                for acc in batch:
+                    try:
+                        rows.extend(_filereport_rows([acc]))
+                    except Exception as single_err:
+                        print(f"⚠️ {acc} atlandı: {single_err}")
+            else:
+                print(f"❌ API Hatası: {e}")
+                sys.exit(1)
+        except Exception as e:
+            print(f"❌ API Hatası: {e}")
+            sys.exit(1)
+    if not rows:
+        print("❌ Eşleşen veri bulunamadı.")
+        sys.exit(1)
+    return rows
+
+def smart_select_and_download(metadata, target_platform, target_cov, genome_size, output_dir, session, manifest_writer, decompress=False, nconn=RANGE_CONNECTIONS, digest_algo='sha256'):
     print(f"\n🚀 Platform Hedefleniyor: {target_platform} | Hedef Coverage: {target_cov}x")
     candidates = []
     for item in metadata:
@@ -98,28 +338,199 @@ def smart_select_and_download(metadata, target_platform, target_cov, genome_size
         urls = ftp_str.split(';')
         if target_platform == "SHORT":
             if len(urls) < 2: continue
-            download_urls = urls[:2]
+            # Doğru eşleri (R1/R2) seç; desen tutmazsa ilk ikiye düş
+            r1, r2 = detect_r1_r2(urls)
+            download_urls = [r1[0], r2[0]] if r1 and r2 else urls[:2]
         else:
             download_urls = [urls[0]]
 
         needed_bases = int(genome_size * target_cov * 1.1)
-        print(f"✅ Aday Seçildi: {acc} ({candidate['instrument_platform']})")
+        # Doğrulamayı geçen aday ancak bu noktada tipli kayda dönüşür;
+        # tekrar kullanılan alanlar tek seferde yerel isimlere bağlanır
+        run = run_from_row(candidate)
+        run_acc = run.run_accession
+        platform = run.instrument_platform
+        print(f"✅ Aday Seçildi: {run_acc} ({platform})")
 
-        success = stream_download(acc, download_urls, needed_bases, output_dir, session, manifest_writer, candidate['instrument_platform'])
+        success = stream_download(run_acc, download_urls, needed_bases, output_dir, session, manifest_writer, platform, decompress, nconn, digest_algo)
         if success:
             print(f"🎉 {target_platform} görevi tamamlandı.")
             return
 
     print(f"❌ Tüm adaylar denendi ancak {target_platform} indirmesi tamamlanamadı.")
 
-def stream_download(acc, urls, needed_bases_total, output_dir, session, manifest_writer, platform_name):
-    filenames = []
+# Range yolunun dosyadan özet hesabı bir sonraki indirme ile örtüşsün diye
+# arka planda çalışır (hashlib C döngüsünde GIL'i bırakır, gerçekten paralel)
+_HASH_POOL = ThreadPoolExecutor(max_workers=2)
+
+# 302 zinciri dosya başına bir kez (HEAD ile) çözülür ve önbellenir;
+# sonraki GET'ler (Range parçaları, sürdürme, yeniden deneme) yönlendirme
+# RTT'si ödemeden doğrudan nihai adrese gider
+_RESOLVED_URLS = {}
+
+def _range_download(url, filepath, total_bytes, session, pbar, nconn=RANGE_CONNECTIONS):
+    """Dosyanın ilk total_bytes baytını nconn paralel Range GET ile indirir.
+
+    TCP slow-start maliyeti bağlantılar arasında amortize edilir. Parçalar
+    önceden boyutlandırılmış dosyanın çakışmayan bölgelerine os.pwrite ile
+    yazılır. Sunucu Range'i yok sayarsa (206 yerine 200) False döner ve
+    çağıran tek akışlı yola düşer.
+    """
+    part = total_bytes // nconn
+    ranges = [(i * part, total_bytes - 1 if i == nconn - 1 else (i + 1) * part - 1) for i in range(nconn)]
+    fd = os.open(filepath, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o644)
+    try:
+        # Alan baştan bitişik ayrılır (extent bölünmesi ve tekrarlanan metadata
+        # güncellemesi yok); fallocate olmayan platformlarda boyut yine sabitlenir
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, total_bytes)
+        else:
+            os.truncate(fd, total_bytes)
+
+        def _fetch_part(bounds):
+            start, end = bounds
+            with session.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True, timeout=TIMEOUT) as r:
+                # Dosyalar zaten .gz: urllib3'ün şeffaf gunzip'i devre dışı
+                r.raw.decode_content = False
+                r.raise_for_status()
+                if r.status_code != 206: return False  # Range desteklenmiyor
+                pos = start
+                # Worker başına tek tahsisli tampon; pwrite dilimi doğrudan alır
+                buf = bytearray(CHUNK_SIZE)
+                mv = memoryview(buf)
+                while True:
+                    n = r.raw.readinto(mv)
+                    if not n: break
+                    os.pwrite(fd, mv[:n], pos)
+                    pos += n
+                    pbar.update(n)
+                return pos == end + 1
+
+        with ThreadPoolExecutor(max_workers=nconn) as pool:
+            return all(pool.map(_fetch_part, ranges))
+    finally:
+        os.close(fd)
+
+def _build_manifest_row(common_fields, filename, filesize, digest, etag=''):
+    """Aday-ortak alanlar + dosyaya özgü alanlardan tek manifest satırı kurar.
+
+    _etag manifest kolonu değildir; satırla birlikte taşınır ve yan dosya
+    yazımında tüketilir. digest_algo aday-ortak alanlardan gelir.
+    """
+    return dict(common_fields, filename=filename, filesize=filesize, digest=digest, _etag=etag)
+
+def _load_meta(meta_path):
+    """Yan dosyadaki (etag, size, sha256) kaydını okur; yoksa/bozuksa None."""
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _resume_download(full_url, filepath, have, expected, session):
+    """Yarım kalan dosyayı Range ile kaldığı yerden tamamlar; son boyutu döner.
+
+    Sunucu Range'i yok sayarsa (206 gelmezse) 0 döner ve dosya baştan iner.
+    """
+    headers = {'Range': f'bytes={have}-{expected - 1}'}
+    with session.get(full_url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+        r.raw.decode_content = False
+        r.raise_for_status()
+        if r.status_code != 206:
+            return 0
+        with tqdm(total=expected, initial=have, unit='B', unit_scale=True, desc=os.path.basename(filepath)) as pbar:
+            with open(filepath, 'ab', buffering=WRITE_BUFFER) as f:
+                # Tek tahsisli tampon: chunk başına bytes nesnesi üretilmez
+                buf = bytearray(CHUNK_SIZE)
+                mv = memoryview(buf)
+                while True:
+                    n = r.raw.readinto(mv)
+                    if not n: break
+                    f.write(mv[:n])
+                    have += n
+                    pbar.update(n)
+    return have
+
+def _single_stream_download(full_url, filepath, filename, download_limit_bytes, session, hasher=None, decompress=False):
+    """Tek bağlantılı indirme yolu; yazılan bayt sayısını döner.
+
+    hasher verilirse her chunk yazılmadan önce özete eklenir; böylece
+    manifest için dosyayı diskten ikinci kez okumak gerekmez. decompress
+    verilirse gzip çözümü indirme sırasında yapılır (.gz diske inip tekrar
+    okunup açılmaz); limit bu durumda diske yazılan (açılmış) baytlara uygulanır.
+    """
+    # Bayt bütçesi sunucuya Range ile bildirilir: akışı ortadan koparmak
+    # yerine sunucu tam limitte durur ve bağlantı keep-alive ile yeniden
+    # kullanılabilir kalır. Çözerek indirmede limit açılmış baytlara
+    # uygulandığından sıkıştırılmış akış Range ile kesilmez.
+    req_headers = None
+    if download_limit_bytes and not decompress:
+        req_headers = {'Range': f'bytes=0-{download_limit_bytes - 1}'}
+    with session.get(full_url, headers=req_headers, stream=True, timeout=TIMEOUT) as r:
+        r.raw.decode_content = False
+        # Range tanımayan sunucu 206 yerine 200 + tam gövde döner; ikisi de
+        # geçerli, emniyet için akış içi limit kontrolü korunur
+        r.raise_for_status()
+        total_size = int(r.headers.get('content-length', 0))
+        # İsteğe bağlı: gzip akışını inerken çöz (content-length sıkıştırılmış
+        # boyut olduğundan ilerleme çubuğu bu modda toplamsız çalışır)
+        src = _gzip.GzipFile(fileobj=r.raw) if decompress else r.raw
+
+        # TQDM Progress Bar Entegrasyonu
+        with tqdm(total=None if decompress else total_size, unit='B', unit_scale=True, desc=filename) as pbar:
+            # Büyük yazma tamponu: küçük write() syscall'larını amortize eder
+            with open(filepath, 'wb', buffering=WRITE_BUFFER) as f:
+                # Boyut belliyken alanı baştan ayır (sayfa sayfa büyüme yerine)
+                prealloc = 0
+                if not decompress and total_size and hasattr(os, 'posix_fallocate'):
+                    prealloc = min(total_size, download_limit_bytes)
+                    os.posix_fallocate(f.fileno(), 0, prealloc)
+                downloaded = 0
+                since_update = 0  # tqdm'e henüz bildirilmemiş bayt sayısı
+                # Tek tahsisli okuma döngüsü: chunk başına yeni bytes nesnesi
+                # üretmek yerine sabit bir bytearray'e readinto ile doldurulur
+                buf = bytearray(CHUNK_SIZE)
+                mv = memoryview(buf)
+                readinto = getattr(src, 'readinto', None)
+                while True:
+                    if readinto is not None:
+                        n = readinto(mv)
+                        if not n: break
+                        chunk = mv[:n]
+                    else:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk: break
+                        n = len(chunk)
+                    if hasher is not None: hasher.update(chunk)
+                    f.write(chunk)
+                    downloaded += n
+                    since_update += n
+                    # İlerleme çubuğunu her chunk'ta değil ~1 MiB'de bir güncelle
+                    if since_update >= (1 << 20):
+                        pbar.update(since_update)
+                        since_update = 0
+                    if downloaded >= download_limit_bytes:
+                        pbar.set_description(f"{filename} (Limit: 200MB)")
+                        break
+                pbar.update(since_update)
+                # Transfer ayrılan alandan kısa kaldıysa sıfır kuyruğunu kes
+                if downloaded < prealloc:
+                    f.truncate(downloaded)
+    return downloaded
+
+def stream_download(acc, urls, needed_bases_total, output_dir, session, manifest_writer, platform_name, decompress=False, nconn=RANGE_CONNECTIONS, digest_algo='sha256'):
     # Scientific Demo Limiti: 200MB (Workshop güvenliği için)
-    download_limit_bytes = 200 * 1024 * 1024 
+    download_limit_bytes = 200 * 1024 * 1024
     if needed_bases_total < 100000000: download_limit_bytes = 100 * 1024 * 1024
 
-    for i, url in enumerate(urls):
-        filename = f"{acc}_{platform_name}_{i+1}.fastq.gz".replace(" ", "_")
+    # Aday genelinde ortak manifest alanları bir kez kurulur; satırlar toplanıp
+    # aday başına TEK yazımla (tek kilit + tek fsync) manifeste eklenir
+    common_fields = {'organism': acc, 'platform': platform_name, 'digest_algo': digest_algo}
+
+    def _download_one(i, url):
+        """Tek URL'i indirir; manifest satırını döner, hata durumunda None."""
+        suffix = "fastq" if decompress else "fastq.gz"
+        filename = f"{acc}_{platform_name}_{i+1}.{suffix}".replace(" ", "_")
         filepath = os.path.join(output_dir, filename)
 
         # PROTOCOL FIX: FTP -> HTTP
@@ -128,40 +539,114 @@ def stream_download(acc, urls, needed_bases_total, output_dir, session, manifest
         else: full_url = url
 
         try:
-            with session.get(full_url, stream=True, timeout=30) as r:
-                r.raise_for_status()
-                total_size = int(r.headers.get('content-length', 0))
-                
-                # TQDM Progress Bar Entegrasyonu
-                with tqdm(total=total_size, unit='B', unit_scale=True, desc=filename) as pbar:
-                    with open(filepath, 'wb') as f:
-                        downloaded = 0
-                        for chunk in r.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                pbar.update(len(chunk))
-                                downloaded += len(chunk)
-                                if downloaded >= download_limit_bytes:
-                                    pbar.set_description(f"{filename} (Limit: 200MB)")
-                                    break
-            
-            filenames.append(filename)
-            manifest_writer.writerow({'filename': filename, 'organism': acc, 'platform': platform_name, 'filesize': downloaded})
+            downloaded = 0
+            # Boyut/ETag bilgisi: atlama, sürdürme ve Range yolu kararları için
+            try:
+                head = session.head(full_url, allow_redirects=True, timeout=TIMEOUT)
+                total_size = int(head.headers.get('content-length', 0))
+                etag = head.headers.get('ETag', '')
+                # Yönlendirme sonrası nihai URL'i kullan (parça başına 302 RTT'si yok)
+                full_url = _RESOLVED_URLS.setdefault(full_url, head.url)
+            except Exception:
+                total_size, etag = 0, ''
+            effective_total = min(total_size, download_limit_bytes)
+
+            # Önceki çalıştırmadan kalan dosya: değişmemişse hiç indirme,
+            # yarım kalmışsa kaldığı yerden sürdür (etag eşleşmesi şart)
+            meta = _load_meta(filepath + '.meta.json') if (etag and not decompress) else None
+            if meta and meta.get('etag') == etag:
+                try:
+                    local_size = os.path.getsize(filepath)
+                except OSError:
+                    local_size = -1
+                if local_size == meta.get('size') == effective_total:
+                    print(f"⏭️ {filename} değişmemiş, yeniden indirilmiyor.")
+                    # Yan dosyadaki özet farklı algoritmayla alınmışsa yeniden hesapla
+                    if meta.get('digest_algo') == digest_algo:
+                        digest_val = meta.get('digest', '')
+                    else:
+                        digest_val = _HASH_POOL.submit(calculate_digest, filepath, digest_algo)
+                    return _build_manifest_row(common_fields, filename,
+                                               local_size, digest_val)
+                if 0 < local_size < effective_total:
+                    print(f"▶️ {filename} kaldığı yerden sürdürülüyor ({local_size/1e6:.1f} MB mevcut).")
+                    downloaded = _resume_download(full_url, filepath, local_size, effective_total, session)
+
+            # Çözerek indirmede çıktı boyutu baştan bilinemez; Range yolu devre dışı
+            if not downloaded and nconn > 1 and not decompress and hasattr(os, 'pwrite') and effective_total >= nconn * CHUNK_SIZE:
+                try:
+                    with tqdm(total=effective_total, unit='B', unit_scale=True, desc=filename) as pbar:
+                        if _range_download(full_url, filepath, effective_total, session, pbar, nconn):
+                            downloaded = effective_total
+                except Exception as range_err:
+                    print(f"\n⚠️ Range indirmesi olmadı ({range_err}), tek akışa dönülüyor.")
+                    downloaded = 0
+            digest_hex = None
+            if not downloaded:
+                # Tek akışta özet indirme sırasında güncellenir: ikinci disk geçişi yok
+                hasher = _new_hasher(digest_algo)
+                downloaded = _single_stream_download(full_url, filepath, filename, download_limit_bytes, session, hasher, decompress)
+                digest_hex = hasher.hexdigest()
+
+            # Range yolunda parçalar sırasız tamamlandığı için özet dosyadan hesaplanır;
+            # hesap arka plana atılır ki eş zamanlı diğer indirme beklemesin
+            return _build_manifest_row(common_fields, filename, downloaded,
+                                       digest_hex or _HASH_POOL.submit(calculate_digest, filepath, digest_algo),
+                                       etag)
         except Exception as e:
             print(f"\n❌ İndirme hatası: {e}")
-            if os.path.exists(filepath): os.remove(filepath)
-            return False
+            # stat+unlink yerine tek unlink: dosya yoksa sessizce geç
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+            return None
+
+    # R1/R2 gibi çoklu URL'ler paralel indirilir: Session bağlantı havuzu
+    # iş parçacığı güvenlidir, toplam süre en yavaş borunun süresine iner
+    if len(urls) > 1:
+        with ThreadPoolExecutor(max_workers=len(urls)) as dl_pool:
+            manifest_rows = list(dl_pool.map(lambda iu: _download_one(*iu), enumerate(urls)))
+    else:
+        manifest_rows = [_download_one(i, url) for i, url in enumerate(urls)]
+    if any(row is None for row in manifest_rows):
+        return False
+
+    # Manifeste yazmadan önce arka plandaki özet hesaplarını topla ve
+    # sonraki çalıştırmaların atlama/sürdürme kararı için yan dosyayı güncelle
+    for row in manifest_rows:
+        if isinstance(row['digest'], Future):
+            row['digest'] = row['digest'].result()
+        row_etag = row.pop('_etag', '')
+        if row_etag:
+            meta_path = os.path.join(output_dir, row['filename'] + '.meta.json')
+            with open(meta_path, 'w') as f:
+                json.dump({'etag': row_etag, 'size': row['filesize'],
+                           'digest': row['digest'], 'digest_algo': row['digest_algo']}, f)
+    manifest_writer.append_rows(manifest_rows)
     return True
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--organism", type=str, required=True)
     parser.add_argument("--strategy", type=str, default="WGS")
+    # Yeni Özellik: Belirli accession'ları tek filereport çağrısıyla sorgula (ENA taraması atlanır)
+    parser.add_argument("--accession", type=str, help="Virgülle ayrılmış run accession listesi (örn: SRR1,SRR2)")
     parser.add_argument("--cov-short", type=int, default=50)
     parser.add_argument("--cov-long", type=int, default=30)
     parser.add_argument("--genome-size", type=int)
     # Yeni Özellik: Output Dir Parametresi
     parser.add_argument("--output-dir", type=str, default="data")
+    # Manifest özet algoritması: sha256 varsayılan; blake3/xxh3 bütünlük
+    # kontrolü için yeterli ve çok daha hızlıdır (bağımlılık yoksa sha256'ya düşer)
+    parser.add_argument("--digest", choices=DIGEST_ALGOS, default="sha256",
+                        help="Manifest özet algoritması (varsayılan: sha256)")
+    # Dosya başına paralel Range bağlantısı sayısı (1 = tek akış zorla)
+    parser.add_argument("--range-connections", type=int, default=RANGE_CONNECTIONS,
+                        help="Dosya başına paralel Range GET sayısı (varsayılan: 4)")
+    # Yeni Özellik: .gz'i inerken çöz, diske .fastq yaz (diske in-oku-aç turu yok)
+    parser.add_argument("--decompress", action="store_true",
+                        help="FASTQ'yu indirme sırasında gzip'ten çözerek .fastq olarak kaydet")
     args = parser.parse_args()
 
     # Path Güvenliği: Eğer script notebooks klasöründen çağrılırsa bile data kök dizine gitmeli
@@ -169,20 +654,27 @@ def main():
     os.makedirs(args.output_dir, exist_ok=True)
     manifest_path = os.path.join(args.output_dir, "manifest.tsv")
 
-    file_exists = os.path.isfile(manifest_path)
-    manifest_file = open(manifest_path, 'a', newline='')
-    fields = ['filename', 'organism', 'platform', 'filesize']
-    writer = csv.DictWriter(manifest_file, fieldnames=fields, delimiter='\t')
-    if not file_exists: writer.writeheader()
-
     session = create_resilient_session()
-    metadata = fetch_metadata(args.organism, args.strategy)
+    if args.accession:
+        accessions = [a.strip() for a in args.accession.split(',') if a.strip()]
+        metadata = fetch_metadata_batch(session, accessions)
+    else:
+        metadata = fetch_metadata(session, args.organism, args.strategy)
     g_size = get_genome_size(args.organism, args.genome_size)
 
+    digest_algo = resolve_digest_algo(args.digest)
+
     print(f"\n🧬 İşlem Başlıyor: {args.organism} (Genom: {g_size/1e6:.2f} Mb)")
-    smart_select_and_download(metadata, "SHORT", args.cov_short, g_size, args.output_dir, session, writer)
-    smart_select_and_download(metadata, "LONG", args.cov_long, g_size, args.output_dir, session, writer)
-    manifest_file.close()
+    with ManifestWriter(manifest_path) as mw:
+        # SHORT ve LONG görevleri bağımsızdır ve ağ beklemesinde geçer;
+        # iki worker ile örtüştürünce toplam süre en uzun transfere iner
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            missions = [
+                pool.submit(smart_select_and_download, metadata, "SHORT", args.cov_short, g_size, args.output_dir, session, mw, args.decompress, args.range_connections, digest_algo),
+                pool.submit(smart_select_and_download, metadata, "LONG", args.cov_long, g_size, args.output_dir, session, mw, args.decompress, args.range_connections, digest_algo),
+            ]
+            for mission in missions:
+                mission.result()
     print("\n✅ GenoStream v4.0.3 tamamlandı.")
 
 if __name__ == "__main__":
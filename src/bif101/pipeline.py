@@ -1,6 +1,6 @@
 import os
 import subprocess
-import glob
+from concurrent.futures import ThreadPoolExecutor
 
 # Çıktıların kaydedileceği ana klasörler
 REPORT_DIRS = ["reports/fastqc", "reports/nanoplot", "reports/multiqc"]
@@ -10,6 +10,21 @@ def setup_folders():
     for d in REPORT_DIRS:
         os.makedirs(d, exist_ok=True)
 
+def _find(tokens, data_dir="data", suffix=".fastq.gz"):
+    """data/ altında uzantısı suffix olup adı tüm desenleri içeren dosyaları listeler.
+
+    glob'un fnmatch derlemesi ve giriş başına ek stat'ı yerine tek dizin
+    taraması; is_file() getdents'ten gelen türü kullanır, yeniden stat yok.
+    Uzantı sonek olarak aranır ki .fastq.gz.meta.json yan dosyaları elenmesin.
+    """
+    try:
+        with os.scandir(data_dir) as it:
+            return sorted(e.path for e in it
+                          if e.is_file() and e.name.endswith(suffix)
+                          and all(t in e.name for t in tokens))
+    except FileNotFoundError:
+        return []
+
 def run_qc_pipeline():
     """
     BIF101 - Scientific Integrity QC Pipeline (v4.0.3)
@@ -20,19 +35,23 @@ def run_qc_pipeline():
 
     # 1. FastQC Analizi (Illumina Verileri)
     print("\n⚙️ FastQC Başlıyor...")
-    illumina_files = glob.glob("data/*ILLUMINA*.fastq.gz")
+    illumina_files = _find(["ILLUMINA"])
 
     if illumina_files:
-        for fastq in illumina_files:
+        # FastQC çağrıları bağımsız: dosyalar paralel işçilerde analiz edilir
+        def _run_fastqc(fastq):
             print(f"Analiz ediliyor: {os.path.basename(fastq)}")
             subprocess.run(["fastqc", fastq, "-o", "reports/fastqc", "-q"], check=True)
+
+        with ThreadPoolExecutor(max_workers=min(len(illumina_files), os.cpu_count() or 1)) as ex:
+            list(ex.map(_run_fastqc, illumina_files))
         print("✅ FastQC bitti.")
     else:
         print("⚠️ Illumina dosyası bulunamadı, FastQC atlanıyor.")
 
     # 2. NanoPlot Analizi (PacBio/Long Read Verileri)
     print("\n⚙️ NanoPlot Başlıyor...")
-    pacbio_files = glob.glob("data/*PACBIO*.fastq.gz")
+    pacbio_files = _find(["PACBIO"])
 
     if pacbio_files:
         # KRİTİK DÜZELTME: Dünkü denemede çöküşü engelleyen hamle: 
@@ -1,27 +1,46 @@
 import os
 import subprocess
 import sys
+from pathlib import Path
 
 def apply_nanoplot_patch():
     """NanoPlot'un çökmesine neden olan Kaleido hatasını kaynak kodda onarır."""
     print("🛠️ NanoPlot kütüphanesine cerrahi müdahale yapılıyor...")
-    target_file = "/usr/local/lib/python3.12/dist-packages/nanoplotter/plot.py"
-    if os.path.exists(target_file):
+    target = Path("/usr/local/lib/python3.12/dist-packages/nanoplotter/plot.py")
+    if target.exists():
         try:
-            # YAMA: Kaleido çağrılarını sustur
-            subprocess.run(["sed", "-i", 's/from kaleido import write_fig_sync/# from kaleido import write_fig_sync/g', target_file], check=True)
-            subprocess.run(["sed", "-i", 's/kaleido.get_chrome_sync()/# kaleido.get_chrome_sync()/g', target_file], check=True)
+            # YAMA: Kaleido çağrılarını sustur (süreç başlatmadan, yerinde
+            # metin değişimi; yama zaten uygulandıysa dosyaya dokunulmaz)
+            src = target.read_text()
+            if "# from kaleido import write_fig_sync" in src:
+                print("   ⏭️ Yama zaten uygulanmış.")
+                return
+            patched = src.replace("from kaleido import write_fig_sync",
+                                  "# from kaleido import write_fig_sync")
+            patched = patched.replace("kaleido.get_chrome_sync()",
+                                      "# kaleido.get_chrome_sync()")
+            target.write_text(patched)
             print("   ✅ Cerrahi müdahale başarılı (Stabilizasyon tamam).")
         except Exception as e:
             print(f"   ⚠️ Yama başarısız: {e}")
 
 def setup_environment():
     print("🚀 BIF101 Laboratuvar Ortamı Hazırlanıyor...")
-    # 1. FastQC
-    subprocess.run("apt-get update -qq && apt-get install -y -qq fastqc", shell=True, check=True)
-    # 2. Kütüphaneler
-    libs = ["multiqc", "NanoPlot", "biopython", "plotly", "kaleido==0.2.1", "pandas", "requests"]
-    subprocess.run([sys.executable, "-m", "pip", "install", "-q"] + libs, check=True)
+    # 1. FastQC (shell parse yok: argv listesiyle doğrudan exec)
+    subprocess.run(["apt-get", "update", "-qq"], check=True)
+    subprocess.run(["apt-get", "install", "-y", "-qq", "fastqc"], check=True)
+    # 2. Kütüphaneler — iki fazlı kurulum: bilinen-iyi sabitlemeler önce
+    # --no-deps ile iner (çözücü geri izlemesi yok), bağımlılıklar ikinci
+    # fazda yalnızca eksikse tamamlanır. Colab'da soğuk kurulumu ciddi kısaltır.
+    # pyfastx isteğe bağlı hızlandırıcıdır; plotting.parse_fastq yoksa da çalışır
+    pinned = [
+        "multiqc==1.22.3", "NanoPlot==1.42.0", "biopython==1.83",
+        "plotly==5.22.0", "kaleido==0.2.1", "pandas==2.2.2",
+        "requests==2.32.3", "pyfastx==2.1.0",
+    ]
+    pip_cmd = [sys.executable, "-m", "pip", "install", "-q", "--prefer-binary"]
+    subprocess.run(pip_cmd + ["--no-deps"] + pinned, check=True)
+    subprocess.run(pip_cmd + ["--upgrade-strategy", "only-if-needed"] + pinned, check=True)
     # 3. Kritik Ameliyat
     apply_nanoplot_patch()
     print("\n🎉 KURULUM VE STABİLİZASYON TAMAMLANDI!")